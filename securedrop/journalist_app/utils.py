@@ -19,6 +19,7 @@ from flask import (
     request,
     send_file,
     sessions,
+    stream_with_context,
     url_for,
 )
 from flask_babel import gettext, ngettext
@@ -217,9 +218,8 @@ def download(
     on_error_redirect: Optional[str] = None,
 ) -> werkzeug.Response:
     """Send client contents of ZIP-file *zip_basename*-<timestamp>.zip
-    containing *submissions*. The ZIP-file, being a
-    :class:`tempfile.NamedTemporaryFile`, is stored on disk only
-    temporarily.
+    containing *submissions*. The ZIP-file is streamed to the client as it
+    is built, so it is never stored on disk.
 
     :param str zip_basename: The basename of the ZIP-file download.
 
@@ -227,7 +227,9 @@ def download(
                              include in the ZIP-file.
     """
     try:
-        zf = Storage.get_default().get_bulk_archive(submissions, zip_directory=zip_basename)
+        zip_stream = Storage.get_default().stream_bulk_archive(
+            submissions, zip_directory=zip_basename
+        )
     except FileNotFoundError:
         flash(
             ngettext(
@@ -249,11 +251,10 @@ def download(
 
     mark_seen(submissions, g.user)
 
-    return send_file(
-        zf.name,
+    return flask.Response(
+        stream_with_context(zip_stream),
         mimetype="application/zip",
-        download_name=attachment_filename,
-        as_attachment=True,
+        headers={"Content-Disposition": "attachment; filename={}".format(attachment_filename)},
     )
 
 
@@ -1,9 +1,11 @@
 # -*- coding: utf-8 -*-
 import binascii
 import gzip
+import io
 import os
 import re
 import tempfile
+import threading
 import typing
 import zipfile
 from hashlib import sha256
@@ -24,13 +26,16 @@ if typing.TYPE_CHECKING:
     # statements has to be marked as noqa.
     # http://flake8.pycqa.org/en/latest/user/error-codes.html?highlight=f401
     from tempfile import _TemporaryFileWrapper  # type: ignore # noqa: F401
-    from typing import IO, List, Optional, Type, Union  # noqa: F401
+    from typing import IO, Dict, Iterator, List, Optional, Set, Tuple, Type, Union  # noqa: F401
 
     from models import Reply, Submission  # noqa: F401
     from sqlalchemy.orm import Session  # noqa: F401
 
 _default_storage: typing.Optional["Storage"] = None
 
+# Size of the reads used to copy submissions into a streamed bulk archive
+BULK_ARCHIVE_CHUNK_SIZE = 64 * 1024
+
 
 VALIDATE_FILENAME = re.compile(
     r"^(?P<index>\d+)\-[a-z0-9-_]*(?P<file_type>msg|doc\.(gz|zip)|reply)\.gpg$"
@@ -109,6 +114,14 @@ class Storage:
         if not rm.check_secure_delete_capability():
             raise AssertionError("Secure file deletion is not possible.")
 
+        # filename -> source directories holding a file of that name, and the
+        # reverse mapping, used by path_without_filesystem_id. Built by a
+        # single scan of the store on first use and kept current by the
+        # save_* methods and move_to_shredder.
+        self.__filename_index = None  # type: Optional[Dict[str, Set[str]]]
+        self.__directory_index = {}  # type: Dict[str, Set[str]]
+        self.__index_lock = threading.Lock()
+
     @classmethod
     def get_default(cls) -> "Storage":
         from sdconfig import config
@@ -177,17 +190,73 @@ class Storage:
             )
         return absolute
 
+    def _build_filename_index(self) -> None:
+        """Scan the store once and record the directory of every file in it.
+        Callers must hold the index lock.
+        """
+        self.__filename_index = {}
+        self.__directory_index = {}
+        for rootdir, _, files in os.walk(os.path.realpath(self.__storage_path)):
+            for file_ in files:
+                self.__filename_index.setdefault(file_, set()).add(rootdir)
+                self.__directory_index.setdefault(rootdir, set()).add(file_)
+
+    def _index_file(self, filesystem_id: str, filename: str) -> None:
+        """Record a file newly saved to the store in the filename index."""
+        directory = os.path.dirname(self.path(filesystem_id, filename))
+        with self.__index_lock:
+            if self.__filename_index is None:
+                # the index will pick this file up when it is first built
+                return
+            self.__filename_index.setdefault(filename, set()).add(directory)
+            self.__directory_index.setdefault(directory, set()).add(filename)
+
+    def _unindex_path(self, path: str) -> None:
+        """Forget a file, or every file under a directory, in the filename
+        index.
+        """
+        with self.__index_lock:
+            if self.__filename_index is None:
+                return
+            if path in self.__directory_index:
+                removed = [
+                    (directory, filename)
+                    for directory, filenames in self.__directory_index.items()
+                    if os.path.commonpath((directory, path)) == path
+                    for filename in filenames
+                ]
+            else:
+                removed = [(os.path.dirname(path), os.path.basename(path))]
+
+            for directory, filename in removed:
+                directories = self.__filename_index.get(filename, set())
+                directories.discard(directory)
+                if not directories:
+                    self.__filename_index.pop(filename, None)
+                filenames = self.__directory_index.get(directory, set())
+                filenames.discard(filename)
+                if not filenames:
+                    self.__directory_index.pop(directory, None)
+
+    def _lookup_filename(self, filename: str) -> "List[str]":
+        with self.__index_lock:
+            if self.__filename_index is None:
+                self._build_filename_index()
+            elif filename not in self.__filename_index:
+                # The file may have been written by another process since
+                # the index was built, so rescan before giving up.
+                self._build_filename_index()
+            assert self.__filename_index is not None
+            directories = self.__filename_index.get(filename, set())
+            return [os.path.join(directory, filename) for directory in directories]
+
     def path_without_filesystem_id(self, filename: str) -> str:
         """Get the normalized, absolute file path, within
         `self.__storage_path` for a filename when the filesystem_id
         is not known.
         """
 
-        joined_paths = []
-        for rootdir, _, files in os.walk(os.path.realpath(self.__storage_path)):
-            for file_ in files:
-                if file_ in filename:
-                    joined_paths.append(os.path.join(rootdir, file_))
+        joined_paths = [p for p in self._lookup_filename(filename) if os.path.exists(p)]
 
         if len(joined_paths) > 1:
             raise TooManyFilesException("Found duplicate files!")
@@ -202,49 +271,79 @@ class Storage:
             )
         return absolute
 
-    def get_bulk_archive(
+    def _bulk_archive_entries(
         self, selected_submissions: "List", zip_directory: str = ""
-    ) -> "_TemporaryFileWrapper":
-        """Generate a zip file from the selected submissions"""
-        zip_file = tempfile.NamedTemporaryFile(
-            prefix="tmp_securedrop_bulk_dl_", dir=self.__temp_dir, delete=False
-        )
+    ) -> "List[Tuple[str, str]]":
+        """Return the (path, arcname) pairs making up a bulk archive of the
+        selected submissions.
+
+        Raises FileNotFoundError if any of the submissions is missing from
+        the store.
+        """
         sources = set([i.source.journalist_designation for i in selected_submissions])
         # The below nested for-loops are there to create a more usable
         # folder structure per #383
         missing_files = False
-
-        with zipfile.ZipFile(zip_file, "w") as zip:
-            for source in sources:
-                fname = ""
-                submissions = [
-                    s for s in selected_submissions if s.source.journalist_designation == source
-                ]
-                for submission in submissions:
-                    filename = self.path(submission.source.filesystem_id, submission.filename)
-
-                    if os.path.exists(filename):
-                        document_number = submission.filename.split("-")[0]
-                        if zip_directory == submission.source.journalist_filename:
-                            fname = zip_directory
-                        else:
-                            fname = os.path.join(zip_directory, source)
-                        zip.write(
-                            filename,
-                            arcname=os.path.join(
-                                fname,
-                                "%s_%s" % (document_number, submission.source.last_updated.date()),
-                                os.path.basename(filename),
-                            ),
-                        )
+        entries = []
+
+        for source in sources:
+            fname = ""
+            submissions = [
+                s for s in selected_submissions if s.source.journalist_designation == source
+            ]
+            for submission in submissions:
+                filename = self.path(submission.source.filesystem_id, submission.filename)
+
+                if os.path.exists(filename):
+                    document_number = submission.filename.split("-")[0]
+                    if zip_directory == submission.source.journalist_filename:
+                        fname = zip_directory
                     else:
-                        missing_files = True
-                        current_app.logger.error("File {} not found".format(filename))
+                        fname = os.path.join(zip_directory, source)
+                    arcname = os.path.join(
+                        fname,
+                        "%s_%s" % (document_number, submission.source.last_updated.date()),
+                        os.path.basename(filename),
+                    )
+                    entries.append((filename, arcname))
+                else:
+                    missing_files = True
+                    current_app.logger.error("File {} not found".format(filename))
 
         if missing_files:
             raise FileNotFoundError
-        else:
-            return zip_file
+
+        return entries
+
+    def get_bulk_archive(
+        self, selected_submissions: "List", zip_directory: str = ""
+    ) -> "_TemporaryFileWrapper":
+        """Generate a zip file from the selected submissions"""
+        entries = self._bulk_archive_entries(selected_submissions, zip_directory)
+
+        zip_file = tempfile.NamedTemporaryFile(
+            prefix="tmp_securedrop_bulk_dl_", dir=self.__temp_dir, delete=False
+        )
+        with zipfile.ZipFile(zip_file, "w") as zip:
+            for filename, arcname in entries:
+                zip.write(filename, arcname=arcname)
+
+        return zip_file
+
+    def stream_bulk_archive(
+        self, selected_submissions: "List", zip_directory: str = ""
+    ) -> "Iterator[bytes]":
+        """Generate a zip file from the selected submissions, yielding it in
+        chunks as it is written instead of building it on disk first.
+
+        Submissions are already compressed and encrypted, so entries are
+        stored rather than deflated. All paths are resolved and checked
+        before this returns, so FileNotFoundError is raised here rather than
+        partway through the response, and the returned iterator does not
+        touch the database.
+        """
+        entries = self._bulk_archive_entries(selected_submissions, zip_directory)
+        return _stream_zip(entries)
 
     def move_to_shredder(self, path: str) -> None:
         """
@@ -268,8 +367,10 @@ class Storage:
 
         relpath = os.path.relpath(path, start=self.storage_path)
         dest = os.path.join(tempfile.mkdtemp(dir=self.__shredder_path), relpath)
+        real_path = os.path.realpath(path)
         current_app.logger.info("Moving {} to shredder: {}".format(path, dest))
         safe_renames(path, dest)
+        self._unindex_path(real_path)
 
     def clear_shredder(self) -> None:
         current_app.logger.info("Clearing shredder")
@@ -357,6 +458,7 @@ class Storage:
                 encrypted_file_path_out=Path(encrypted_file_path),
             )
 
+        self._index_file(filesystem_id, encrypted_file_name)
         return encrypted_file_name
 
     def save_pre_encrypted_reply(
@@ -371,6 +473,7 @@ class Storage:
         with open(encrypted_file_path, "w") as fh:
             fh.write(content)
 
+        self._index_file(filesystem_id, encrypted_file_name)
         return encrypted_file_path
 
     def save_message_submission(
@@ -382,9 +485,48 @@ class Storage:
             message_in=message,
             encrypted_message_path_out=Path(msg_loc),
         )
+        self._index_file(filesystem_id, filename)
         return filename
 
 
+class _ZipStreamBuffer(io.RawIOBase):
+    """An unseekable sink for :class:`zipfile.ZipFile` that holds what has
+    been written until it is drained.
+    """
+
+    def __init__(self) -> None:
+        self._chunks = []  # type: List[bytes]
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b: "Union[bytes, bytearray, memoryview]") -> int:  # type: ignore
+        self._chunks.append(bytes(b))
+        return len(b)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _stream_zip(entries: "List[Tuple[str, str]]") -> "Iterator[bytes]":
+    sink = _ZipStreamBuffer()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_STORED) as zip:
+        for filename, arcname in entries:
+            zinfo = zipfile.ZipInfo.from_file(filename, arcname=arcname)
+            zinfo.compress_type = zipfile.ZIP_STORED
+            with open(filename, "rb") as src, zip.open(zinfo, "w") as dest:
+                while True:
+                    buf = src.read(BULK_ARCHIVE_CHUNK_SIZE)
+                    if not buf:
+                        break
+                    dest.write(buf)
+                    yield sink.drain()
+            yield sink.drain()
+    yield sink.drain()
+
+
 def async_add_checksum_for_file(db_obj: "Union[Submission, Reply]", storage: Storage) -> str:
     return create_queue().enqueue(
         queued_add_checksum_for_file,
@@ -8,6 +8,7 @@ import zipfile
 from pathlib import Path
 from tempfile import TemporaryDirectory
 from typing import Generator
+from unittest import mock
 
 import pytest
 import store
@@ -110,6 +111,51 @@ def test_path_without_filesystem_id_no_file(test_storage):
         test_storage.path_without_filesystem_id(item_filename)
 
 
+def test_path_without_filesystem_id_uses_index(test_storage):
+    filesystem_id = "example"
+    item_filename = "1-quintuple_cant-msg.gpg"
+    create_file_in_source_dir(test_storage.storage_path, filesystem_id, item_filename)
+
+    expected_absolute_path = os.path.join(test_storage.storage_path, filesystem_id, item_filename)
+    assert test_storage.path_without_filesystem_id(item_filename) == expected_absolute_path
+
+    # once the index is built, lookups of known files don't scan the store
+    with mock.patch("store.os.walk") as walk:
+        assert test_storage.path_without_filesystem_id(item_filename) == expected_absolute_path
+        walk.assert_not_called()
+
+
+def test_path_without_filesystem_id_index_tracks_shredder(journalist_app, test_storage):
+    filesystem_id = "example"
+    item_filename = "1-quintuple_cant-msg.gpg"
+    create_file_in_source_dir(test_storage.storage_path, filesystem_id, item_filename)
+    path = test_storage.path_without_filesystem_id(item_filename)
+
+    with journalist_app.app_context():
+        test_storage.move_to_shredder(path)
+
+    with pytest.raises(store.NoFileFoundException):
+        test_storage.path_without_filesystem_id(item_filename)
+
+
+def test_path_without_filesystem_id_index_tracks_saved_replies(test_storage):
+    filesystem_id = "example"
+    os.makedirs(os.path.join(test_storage.storage_path, filesystem_id))
+    with pytest.raises(store.NoFileFoundException):
+        test_storage.path_without_filesystem_id("1-quintuple_cant-reply.gpg")
+
+    test_storage.save_pre_encrypted_reply(
+        filesystem_id, 1, "quintuple_cant", "-----BEGIN PGP MESSAGE-----\nfoo"
+    )
+
+    with mock.patch("store.os.walk") as walk:
+        path = test_storage.path_without_filesystem_id("1-quintuple_cant-reply.gpg")
+        walk.assert_not_called()
+    assert path == os.path.join(
+        test_storage.storage_path, filesystem_id, "1-quintuple_cant-reply.gpg"
+    )
+
+
 def test_verify_path_not_absolute(test_storage):
     with pytest.raises(store.PathException):
         test_storage.verify(os.path.join(test_storage.storage_path, "..", "etc", "passwd"))
@@ -213,6 +259,40 @@ def test_get_zip(journalist_app, test_source, app_storage, config):
         assert zipped_file_content == actual_file_content
 
 
+def test_stream_zip(journalist_app, test_source, app_storage, config):
+    with journalist_app.app_context():
+        submissions = utils.db_helper.submit(app_storage, test_source["source"], 2)
+        filenames = [
+            os.path.join(config.STORE_DIR, test_source["filesystem_id"], submission.filename)
+            for submission in submissions
+        ]
+
+        zip_stream = app_storage.stream_bulk_archive(submissions)
+        archive = zipfile.ZipFile(io.BytesIO(b"".join(zip_stream)))
+        archivefile_contents = archive.infolist()
+
+    assert len(archivefile_contents) == len(filenames)
+    for archived_file, actual_file in zip(archivefile_contents, filenames):
+        assert archived_file.compress_type == zipfile.ZIP_STORED
+        assert os.path.basename(archived_file.filename) == os.path.basename(actual_file)
+        with io.open(actual_file, "rb") as f:
+            actual_file_content = f.read()
+        zipped_file_content = archive.read(archived_file)
+        assert zipped_file_content == actual_file_content
+
+
+def test_stream_zip_missing_file(journalist_app, test_source, app_storage, config):
+    with journalist_app.app_context():
+        submissions = utils.db_helper.submit(app_storage, test_source["source"], 2)
+        os.remove(
+            os.path.join(config.STORE_DIR, test_source["filesystem_id"], submissions[0].filename)
+        )
+
+        # the error must be raised before any of the archive is produced
+        with pytest.raises(FileNotFoundError):
+            app_storage.stream_bulk_archive(submissions)
+
+
 @pytest.mark.parametrize("db_model", [Submission, Reply])
 def test_add_checksum_for_file(config, app_storage, db_model):
     """